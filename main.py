@@ -1,7 +1,10 @@
 import argparse
 import os
 
-from src.pipeline.utils import assert_gpu_available
+# ITK reads its thread count once, so set it before ants is imported
+os.environ.setdefault("ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS", str(os.cpu_count() or 1))
+
+from src.pipeline.utils import assert_gpu_available, wait_for_cleanup
 from src.pipeline.full_pipeline import run_full_pipeline
 
 
@@ -50,6 +53,10 @@ def parse_args():
                         choices=["Rigid", "Affine", "SyN"],
                         help="Transformation type for MNI mapping.")
 
+    parser.add_argument("--registration_backend", default="ants",
+                        choices=["ants", "fireants"],
+                        help="Registration backend: ANTsPy (CPU) or FireANTs (GPU).")
+
     parser.add_argument("--thr_analysis", type=float, default=0.01,
                         help="Lesion-symptom overlap threshold.")
 
@@ -79,8 +86,12 @@ def main():
         mni_transform_type=args.transform_type,
         thr_analysis=args.thr_analysis,
         parallelize=args.parallelize,
+        registration_backend=args.registration_backend,
     )
 
+    # Finish the background folder deletions started by housekeeping
+    wait_for_cleanup()
+
 
 if __name__ == "__main__":
     main()
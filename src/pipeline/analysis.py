@@ -1,5 +1,86 @@
 import numpy as np
 
+try:
+    import cupy as cp
+except ImportError:  # CuPy is optional, fall back to NumPy on the host
+    cp = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional as well
+    njit = None
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _overlap_counts_numba(les, pain):
+        # Single pass over flat uint8 arrays, no temporaries
+        v = 0
+        l = 0
+        r = 0
+        for i in prange(les.size):
+            if les[i]:
+                v += 1
+                p = pain[i]
+                if p == 1:
+                    l += 1
+                elif p == 2:
+                    r += 1
+        return v, l, r
+
+
+def _array_view(image):
+    """Zero-copy NumPy view of an ANTsImage's pixel buffer (read-only use), or a copy if unsupported."""
+    try:
+        return image.view()
+    except AttributeError:
+        return image.numpy()
+
+
+def _pain_labels(pain_data):
+    """
+    Map a pain mask to uint8 labels in [0, 3] (left=1, right=2, other labels >= 3 -> 3),
+    so they can be packed into the 3-bit overlap key.
+    """
+    if pain_data.dtype == np.uint8:
+        return np.minimum(pain_data, 3)
+    # Float/other masks: only exact 1/2 are pain labels (a plain astype would wrap negative/large values)
+    left = (pain_data == 1).view(np.uint8)
+    right = (pain_data == 2).view(np.uint8)
+    right <<= 1
+    right |= left
+    return right
+
+
+def _overlap_counts(lesion_data, pain_data):
+    """
+    Return (lesion_voxels, left_voxels, right_voxels) for a boolean lesion
+    array and a uint8 pain label array with values in [0, 3] (left=1, right=2),
+    see _pain_labels.
+    Runs on the GPU when CuPy is available, else with Numba (if installed) or NumPy.
+    """
+    # ANTsImage.view() arrays are Fortran-ordered -> flatten in F order to avoid a copy
+    # (both arrays use the same order, so elements still pair up)
+    flat_les = lesion_data.reshape(-1, order="F")
+    flat_pain = pain_data.reshape(-1, order="F")
+
+    if cp is None and njit is not None:
+        les = np.ascontiguousarray(flat_les).view(np.uint8)
+        pain = np.ascontiguousarray(flat_pain)
+        return tuple(int(c) for c in _overlap_counts_numba(les, pain))
+
+    xp = cp if cp is not None else np
+
+    # Pack (lesion, pain label) into one key -> a single histogram gives all counts
+    les = xp.asarray(flat_les).view(xp.uint8)
+    key = les << 2
+    key |= xp.asarray(flat_pain)
+    hist = xp.bincount(key, minlength=8)
+
+    # Keys 4-7 are lesion voxels, 5 = lesion & left, 6 = lesion & right
+    return int(hist[4:8].sum()), int(hist[5]), int(hist[6])
+
+
 def run_overlap_analysis(mni_lesion, cpsp_mask, overlap_threshold=0.51, logger = None):
     """
     Check if a lesion overlaps with a (possibly mirrored) pain-related mask region.
@@ -17,10 +98,16 @@ def run_overlap_analysis(mni_lesion, cpsp_mask, overlap_threshold=0.51, logger =
             "overlap_fraction_right": float
         }
     """
-    lesion_data = mni_lesion.numpy() > 0
-    pain_data = cpsp_mask.numpy()
+    lesion_data = _array_view(mni_lesion)
+    if lesion_data.dtype == np.uint8 and lesion_data.max() <= 1:
+        # uint8 0/1 lesion masks (see register_subject_to_mni) can be reinterpreted without a copy
+        lesion_data = lesion_data.view(bool)
+    else:
+        lesion_data = lesion_data > 0
+    pain_data = _pain_labels(_array_view(cpsp_mask))
 
-    lesion_voxels = np.sum(lesion_data) # mni spacing is 1mm3 -> Each voxel equals 1 ml
+    # mni spacing is 1mm3 -> Each voxel equals 1 ml
+    lesion_voxels, overlap_left_voxels, overlap_right_voxels = _overlap_counts(lesion_data, pain_data)
     if lesion_voxels == 0:
         result = {
             "lesion_volume_mm3": 0,
@@ -32,12 +119,8 @@ def run_overlap_analysis(mni_lesion, cpsp_mask, overlap_threshold=0.51, logger =
         logger.info("Lesion mask is empty. No overlap detected.")
         return result
 
-    # Left overlap: check voxels where pain mask == 1
-    overlap_left_voxels = np.sum(np.logical_and(lesion_data, pain_data == 1))
+    # Left overlap: voxels where pain mask == 1, right overlap: pain mask == 2
     overlap_fraction_left = overlap_left_voxels / lesion_voxels
-
-    # Right overlap: check voxels where pain mask == 2
-    overlap_right_voxels = np.sum(np.logical_and(lesion_data, pain_data == 2))
     overlap_fraction_right = overlap_right_voxels / lesion_voxels
 
     result = {
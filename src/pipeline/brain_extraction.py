@@ -14,13 +14,11 @@ from HD_BET import hd_bet_prediction
 #   https://github.com/Tabrisrei/ISLES22_Ensemble/tree/master/src/HD-BET/HD_BET
 #   https://github.com/Tabrisrei/ISLES22_Ensemble/blob/master/src/utils.py#L101 - How to use the HD-BET model
 
+# HD-BET predictors keyed by (device, use_tta, verbose), reused across calls/subjects
+_PREDICTOR_CACHE: dict = {}
 
-def extract_brain(input_path: str, output_path: str, gpu: bool = True, save_mask: bool = True, verbose: bool = False, logger = None):
-
-    logger.info(f"Starting HD-BET on: {input_path}")
-    logger.info(f" --> Output will be saved to: {output_path}")
-    logger.info(f" --> Using GPU: {gpu}")
-
+def get_predictor(gpu: bool = True, verbose: bool = False):
+    """Return a cached HD-BET predictor, building it (and loading the weights) on first use."""
     if gpu: 
         device= "cuda"
         disable_tta = False
@@ -28,11 +26,28 @@ def extract_brain(input_path: str, output_path: str, gpu: bool = True, save_mask
         device= "cpu"
         disable_tta = True
     
-    predictor = hd_bet_prediction.get_hdbet_predictor(
-        use_tta=disable_tta,
-        device=torch.device(device),
-        verbose=verbose
-    )
+    key = (device, disable_tta, verbose)
+    predictor = _PREDICTOR_CACHE.get(key)
+    if predictor is None:
+        predictor = hd_bet_prediction.get_hdbet_predictor(
+            use_tta=disable_tta,
+            device=torch.device(device),
+            verbose=verbose
+        )
+        _PREDICTOR_CACHE[key] = predictor
+    return predictor
+
+
+def extract_brain(input_path: str, output_path: str, gpu: bool = True, save_mask: bool = True, verbose: bool = False, predictor = None, logger = None):
+
+    logger.info(f"Starting HD-BET on: {input_path}")
+    logger.info(f" --> Output will be saved to: {output_path}")
+    logger.info(f" --> Using GPU: {gpu}")
+
+    # Reuse the caller's predictor if given, to avoid reloading the model weights
+    if predictor is None:
+        predictor = get_predictor(gpu=gpu, verbose=verbose)
+
     try:
         hd_bet_prediction.hdbet_predict(input_path, output_path, predictor, keep_brain_mask=save_mask, compute_brain_extracted_image=True)
     except Exception as e:
@@ -47,15 +62,19 @@ def extract_brain_dwi_flair(dwi_b0_img_path, flair_img_path, output_folder, logg
     dwi_output_path = os.path.join(output_folder, "dwi_b0_brain.nii.gz")
     flair_output_path = os.path.join(output_folder, "flair_brain.nii.gz")
 
-    extract_brain(input_path=dwi_b0_img_path, output_path=dwi_output_path, gpu= True, save_mask=True, verbose=False, logger = logger)
-    extract_brain(input_path=flair_img_path, output_path=flair_output_path, gpu= True, save_mask=True, verbose=False, logger = logger)
+    # Load HD-BET once and run both volumes through the same predictor
+    predictor = get_predictor(gpu=True, verbose=False)
+
+    for input_path, output_path in ((dwi_b0_img_path, dwi_output_path), (flair_img_path, flair_output_path)):
+        extract_brain(input_path=input_path, output_path=output_path, gpu= True, save_mask=True, verbose=False, predictor=predictor, logger = logger)
     
     logger.info("Loading brain-extracted images and masks...")
 
+    # Brain masks are binary -> keep them as uint8 (4x smaller than float32)
+    # HD-BET outputs are read only once -> don't keep them in the page cache
     return {
-        "dwi_b0_brain": load_img(dwi_output_path),
-        "dwi_b0_brain_mask": load_img(os.path.join(output_folder,"dwi_b0_brain_bet.nii.gz")),
-        "flair_brain": load_img(flair_output_path),
-        "flair_brain_mask": load_img(os.path.join(output_folder,"flair_brain_bet.nii.gz")),
+        "dwi_b0_brain": load_img(dwi_output_path, drop_cache=True),
+        "dwi_b0_brain_mask": load_img(os.path.join(output_folder,"dwi_b0_brain_bet.nii.gz"), pixeltype="unsigned char", drop_cache=True),
+        "flair_brain": load_img(flair_output_path, drop_cache=True),
+        "flair_brain_mask": load_img(os.path.join(output_folder,"flair_brain_bet.nii.gz"), pixeltype="unsigned char", drop_cache=True),
     }
-
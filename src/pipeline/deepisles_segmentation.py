@@ -13,15 +13,30 @@ def run_deepisles(
     parallelize: bool = True,
     results_mni: bool = False,
     verbose: bool = True,
+    local_subject_dir: str = None, # Same folder as seen from this process (subject_dir is a host path)
+    cuda_cache_dir: str = "/tmp/nv_cache", # Host folder persisting CUDA JIT caches between runs, None to disable
     logger = None
 ):
     """
     Runs DeepISLES segmentation inside Docker.
     """
 
+    # Fail before paying the container start-up cost if an input is missing
+    if local_subject_dir is not None:
+        for file_name in (dwi_file_name, adc_file_name, flair_file_name):
+            path = os.path.join(local_subject_dir, file_name)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"DeepISLES input does not exist: {path}")
+
     cmd = [
         "docker", "run", "--rm", "--gpus", "all",
         "-v", f"{subject_dir}:/app/data",
+    ]
+
+    if cuda_cache_dir:
+        cmd += ["-v", f"{cuda_cache_dir}:/app/.nv_cache", "-e", "CUDA_CACHE_PATH=/app/.nv_cache"]
+
+    cmd += [
         "isleschallenge/deepisles",
         "--dwi_file_name", dwi_file_name,
         "--adc_file_name", adc_file_name,
@@ -44,7 +59,26 @@ def run_deepisles(
         message = f"Running DeepISLES command:\n{' '.join(cmd)}"
         logger.info(message)
 
-    subprocess.run(cmd, check=True)
+    if verbose and logger:
+        # Stream the container output into the pipeline log while it runs
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        try:
+            for line in proc.stdout:
+                line = line.rstrip()
+                if line:
+                    logger.info(f"[DeepISLES] {line}")
+            proc.wait()
+        finally:
+            # Reading was interrupted (e.g. KeyboardInterrupt) -> do not leave docker run behind
+            if proc.returncode is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+        if proc.returncode:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+    else:
+        subprocess.run(cmd, check=True)
 
     if verbose:
         logger.info("DeepISLES segmentation completed successfully.")
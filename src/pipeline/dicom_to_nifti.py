@@ -1,13 +1,57 @@
 import os
+import re
 import shutil
 import tempfile
 from pathlib import Path
+import numpy as np
+import ants
 import pydicom
-import dicom2nifti
-import dicom2nifti.settings as settings
 
+try:
+    from pydicom.pixels import apply_rescale
+except ImportError:  # pydicom < 3
+    from pydicom.pixel_data_handlers.util import apply_modality_lut as apply_rescale
 
-def dicom_to_nifti(input_path: str, output_dir: str = None, logger=None) -> str:
+# Header tags parsed when scanning DICOM files (pixel data is skipped)
+SCAN_TAGS = ["ImagePositionPatient", "InstanceNumber", "PixelSpacing", "SliceThickness"]
+
+
+def _pydicom_to_nifti(input_path: Path, output_file: str) -> str:
+    """
+    Converts a single-frame DICOM file to NIfTI with pydicom, applying the
+    modality rescale and using the ImagePositionPatient/ImageOrientationPatient geometry.
+    Multi-frame files must go through dicom2nifti.
+    """
+    ds = pydicom.dcmread(str(input_path))
+
+    if int(ds.get("NumberOfFrames", 1)) > 1:
+        raise ValueError(f"pydicom backend only supports single-frame DICOM files, use dicom2nifti for {input_path}")
+
+    missing = [tag for tag in ("ImagePositionPatient", "ImageOrientationPatient", "PixelSpacing") if tag not in ds]
+    if missing:
+        raise ValueError(f"DICOM file {input_path} lacks geometry tags: {', '.join(missing)}")
+
+    # Stored values -> real values (RescaleSlope/RescaleIntercept, e.g. ADC)
+    volume = apply_rescale(ds.pixel_array, ds)
+
+    # pydicom arrays are (rows, cols), ANTs expects (x, y, z)
+    volume = np.ascontiguousarray(volume[np.newaxis].transpose(2, 1, 0), dtype=np.float32)
+
+    row_cosine = np.asarray(ds.ImageOrientationPatient[:3], dtype=float)
+    col_cosine = np.asarray(ds.ImageOrientationPatient[3:], dtype=float)
+    direction = np.column_stack([row_cosine, col_cosine, np.cross(row_cosine, col_cosine)])
+
+    pixel_spacing = ds.PixelSpacing
+    slice_spacing = ds.get("SpacingBetweenSlices", ds.get("SliceThickness", 1.0))
+    spacing = (float(pixel_spacing[1]), float(pixel_spacing[0]), float(slice_spacing))
+    origin = tuple(float(v) for v in ds.ImagePositionPatient)
+
+    image = ants.from_numpy(volume, origin=origin, spacing=spacing, direction=direction)
+    ants.image_write(image, output_file)
+    return output_file
+
+
+def dicom_to_nifti(input_path: str, output_dir: str = None, logger=None, backend: str = "dicom2nifti") -> str:
     """
     Converts a DICOM file or folder to a correctly oriented NIfTI file
     using dicom2nifti for robust handling of direction cosines.
@@ -17,29 +61,63 @@ def dicom_to_nifti(input_path: str, output_dir: str = None, logger=None) -> str:
         output_dir: Directory to save the resulting NIfTI file.
         modality:   Name used to generate output filename.
         logger:     Optional logger.
+        backend:    "dicom2nifti" (default) or "pydicom". The pydicom backend
+                    only handles single-frame, single-file inputs; folders always use dicom2nifti.
 
     Returns:
         Path to the saved NIfTI file.
     """
 
-    settings.disable_validate_slice_increment()
-    settings.disable_validate_slicecount()
-    settings.disable_validate_orientation()
-    # settings.disable_validate_qform_code()
-    settings.disable_validate_orthogonal()
-
     input_path = Path(input_path)
 
+    # If input is already NIfTI → just return it (before any dicom2nifti work)
+    if str(input_path).lower().endswith((".nii", ".nii.gz")):
+        if logger:
+            logger.info(f"{input_path} is already NIfTI → skipping conversion.")
+        return str(input_path.resolve())
+
     if output_dir is None:
         output_dir = input_path.parent
 
     os.makedirs(output_dir, exist_ok=True)
 
-    # If input is already NIfTI → just return it
-    if input_path.suffix.lower() in [".nii", ".gz", ".nii.gz"]:
+    # Output file (Path.stem would keep ".nii" of "x.nii.gz")
+    output_name = re.sub(r"\.(nii(\.gz)?|dcm)$", "", input_path.name, flags=re.IGNORECASE)
+    output_file = os.path.join(output_dir, f"{output_name}.nii.gz")
+
+    # Single DICOM file → dicom2nifti's series detection is not needed
+    if backend == "pydicom" and input_path.is_file():
         if logger:
-            logger.info(f"{input_path} is already NIfTI → skipping conversion.")
-        return str(input_path.resolve())
+            logger.info(f"Converting {input_path} with pydicom → {output_file}")
+        return _pydicom_to_nifti(input_path, output_file)
+    if backend not in ("dicom2nifti", "pydicom"):
+        raise ValueError(f"Unknown DICOM conversion backend: {backend}")
+
+    import dicom2nifti
+    import dicom2nifti.settings as settings
+
+    settings.disable_validate_slice_increment()
+    settings.disable_validate_slicecount()
+    settings.disable_validate_orientation()
+    # settings.disable_validate_qform_code()
+    settings.disable_validate_orthogonal()
+
+    # Flat folder of *.dcm files → convert in place, no staging needed
+    if input_path.is_dir():
+        entries = [f for f in input_path.iterdir() if not f.name.startswith(".")]
+        if entries and all(f.is_file() and f.suffix.lower() == ".dcm" for f in entries):
+            if logger:
+                logger.info(f"Running dicom2nifti on {len(entries)} slices → {output_file}")
+
+            dicom2nifti.convert_dicom.dicom_series_to_nifti(
+                str(input_path),
+                output_file,
+                reorient_nifti=False   # preserve original orientation for ANTs
+            )
+
+            if logger:
+                logger.info(f"Saved NIfTI to: {output_file}")
+            return output_file
 
     if logger:
         logger.info(f"Collecting DICOMs from {input_path}")
@@ -50,13 +128,14 @@ def dicom_to_nifti(input_path: str, output_dir: str = None, logger=None) -> str:
     if input_path.is_dir():
         for f in sorted(input_path.glob("*.dcm")):
             try:
-                ds = pydicom.dcmread(str(f))
+                # Headers only: the pixel data is decoded later by dicom2nifti
+                ds = pydicom.dcmread(str(f), stop_before_pixels=True, specific_tags=SCAN_TAGS)
                 dicom_files.append(ds)
             except Exception as e:
                 if logger:
                     logger.warning(f"Warning: Could not read DICOM file {f}: {e}")
     else:
-        dicom_files = [pydicom.dcmread(str(input_path))]
+        dicom_files = [pydicom.dcmread(str(input_path), stop_before_pixels=True, specific_tags=SCAN_TAGS)]
 
     if len(dicom_files) == 0:
         raise RuntimeError(f"No readable DICOM files found in {input_path}")
@@ -65,7 +144,7 @@ def dicom_to_nifti(input_path: str, output_dir: str = None, logger=None) -> str:
         logger.info(f"Found {len(dicom_files)} DICOM files")
 
     # -------------------------
-    # Create temp folder of DICOMs
+    # Create temp folder of DICOMs (symlinks, dicom2nifti only reads them)
     # -------------------------
     temp_dir = tempfile.mkdtemp()
     if logger:
@@ -78,10 +157,12 @@ def dicom_to_nifti(input_path: str, output_dir: str = None, logger=None) -> str:
                 if isinstance(dicom_file, str)
                 else dicom_file.filename
             )
-            shutil.copy(src, os.path.join(temp_dir, f"dicom_{idx}.dcm"))
-
-        # Output file
-        output_file = os.path.join(output_dir, f"{input_path.stem}.nii.gz")
+            dst = os.path.join(temp_dir, f"dicom_{idx}.dcm")
+            try:
+                os.symlink(os.path.abspath(src), dst)
+            except OSError:
+                # e.g. no symlink privilege on Windows
+                shutil.copy(src, dst)
 
         if logger:
             logger.info(f"Running dicom2nifti on {len(dicom_files)} slices → {output_file}")
@@ -101,4 +182,4 @@ def dicom_to_nifti(input_path: str, output_dir: str = None, logger=None) -> str:
             logger.info(f"Removing temp folder: {temp_dir}")
         shutil.rmtree(temp_dir, ignore_errors=True)
 
-    return output_file
\ No newline at end of file
+    return output_file
@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from src.pipeline.dicom_to_nifti import dicom_to_nifti
 from src.pipeline.utils import load_img, load_and_check_images, housekeeping, create_logger, runtime_checks, resolve_host_path, save_results_to_csv, resample_image_to_target
@@ -22,6 +23,7 @@ def run_full_pipeline(
     mni_transform_type: str = "Affine", # Either Rigid, Affine, or SyN (SyN is non-linear)
     thr_analysis: float = 0.01,
     parallelize = True,
+    registration_backend: str = "ants", # Either ants (CPU) or fireants (GPU)
 ):
     """
     Full pipeline for preprocessing, brain extraction, within-subject registration,
@@ -39,10 +41,17 @@ def run_full_pipeline(
     resolve_host_path(output_dir)
 
     # Convert inputs to NIfTI if needed, optionally anonymize
-    dwi_b0_path = dicom_to_nifti(os.path.join(subject_nifti_folder, dwi_b0_file_name), output_dir=output_dir, logger = logger)
-    dwi_b1000_path = dicom_to_nifti(os.path.join(subject_nifti_folder, dwi_b1000_file_name), output_dir=output_dir, logger = logger)
-    adc_path = dicom_to_nifti(os.path.join(subject_nifti_folder, adc_file_name), output_dir=output_dir, logger = logger)
-    flair_path = dicom_to_nifti(os.path.join(subject_nifti_folder, flair_file_name), output_dir=output_dir, logger = logger)
+    input_files = [dwi_b0_file_name, dwi_b1000_file_name, adc_file_name, flair_file_name]
+
+    def convert(file_name):
+        return dicom_to_nifti(os.path.join(subject_nifti_folder, file_name), output_dir=output_dir, logger = logger)
+
+    if parallelize:
+        # The four series are independent and IO-bound
+        with ThreadPoolExecutor(max_workers=len(input_files)) as executor:
+            dwi_b0_path, dwi_b1000_path, adc_path, flair_path = executor.map(convert, input_files)
+    else:
+        dwi_b0_path, dwi_b1000_path, adc_path, flair_path = map(convert, input_files)
 
     # Collect all paths in a dict for loading
     input_paths = {
@@ -78,6 +87,8 @@ def run_full_pipeline(
         moving_dict=moving_dict,
         output_path=reg_folder,
         save=save_intermediate,
+        backend=registration_backend,
+        parallelize=parallelize,
         logger = logger
     )
 
@@ -98,6 +109,7 @@ def run_full_pipeline(
         parallelize = parallelize,
         results_mni = False,
         verbose = True,
+        local_subject_dir = subject_space_results,
         logger = logger
     )
 
@@ -116,6 +128,7 @@ def run_full_pipeline(
         mni_template=images["mni_template"],
         output_dir=output_dir, 
         type_of_transform=mni_transform_type,
+        backend=registration_backend,
         logger = logger
     )
 
@@ -1,7 +1,104 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import torch
+import torch.nn.functional as F
 import ants
+from src.pipeline.registration import register
 
-def register_subject_to_mni(images_to_register, mni_template, output_dir, type_of_transform, logger = None):
+
+def load_composite_transform(transform_list):
+    """
+    Read a list of ANTs transform files once and compose them into a single transform.
+    transform_list uses the ants.apply_transforms ordering (last transform is applied first),
+    e.g. [1Warp, 0GenericAffine] for SyN.
+    """
+    transforms = []
+    for path in transform_list:
+        if path.endswith((".nii", ".nii.gz")):
+            # Displacement field (e.g. SyN warp)
+            transforms.append(ants.transform_from_displacement_field(ants.image_read(path)))
+        else:
+            transforms.append(ants.read_transform(path))
+    # compose_ants_transforms applies its list front to back -> reverse to match apply_transforms
+    return ants.compose_ants_transforms(list(reversed(transforms)))
+
+
+def _same_space(a, b):
+    return (
+        a.shape == b.shape
+        and np.allclose(a.origin, b.origin)
+        and np.allclose(a.spacing, b.spacing)
+        and np.allclose(a.direction, b.direction)
+    )
+
+
+def warp_images_gpu(images, reference, transform_list, composite_path, device="cuda"):
+    """
+    Warp images that share one moving space into the reference space on the GPU.
+
+    The transforms are collapsed by ANTs into a single displacement field (in the
+    reference space), turned into a sampling grid once, and all images are resampled
+    with torch.nn.functional.grid_sample in one batched call per interpolation mode.
+
+    Args:
+        images (dict): {name: ANTsImage}, all in the same (moving) space
+        reference (ANTsImage): Fixed image defining the output space
+        transform_list (list): ANTs forward transforms (moving -> reference)
+        composite_path (str): Prefix for the composed displacement field file
+
+    Returns:
+        dict: {name: warped ANTsImage}; "lesion" uses nearest neighbour, others linear
+    """
+    moving = next(iter(images.values()))
+
+    # Collapse all transforms into one displacement field defined on the reference grid
+    field_path = ants.apply_transforms(
+        fixed=reference,
+        moving=moving,
+        transformlist=transform_list,
+        compose=composite_path
+    )
+    displacement = torch.from_numpy(ants.image_read(field_path).numpy().astype(np.float32)).to(device)
+
+    def as_tensor(values):
+        return torch.tensor(np.asarray(values, dtype=np.float32), device=device)
+
+    # Reference voxel indices -> physical points (ITK: p = origin + D @ (spacing * index))
+    axes = [torch.arange(n, device=device, dtype=torch.float32) for n in reference.shape]
+    index = torch.stack(torch.meshgrid(*axes, indexing="ij"), dim=-1)
+    points = (index * as_tensor(reference.spacing)) @ as_tensor(reference.direction).T + as_tensor(reference.origin)
+
+    # Displaced points -> continuous moving indices -> grid_sample coordinates in [-1, 1]
+    points = points + displacement
+    moving_index = ((points - as_tensor(moving.origin)) @ as_tensor(moving.direction)) / as_tensor(moving.spacing)
+    grid = 2 * moving_index / (as_tensor(moving.shape) - 1) - 1
+    grid = grid.flip(-1).unsqueeze(0)  # grid_sample expects (x, y, z) = (W, H, D)
+    del index, points, moving_index, displacement
+
+    warped = {}
+    groups = {
+        "bilinear": [name for name in images if name != "lesion"],
+        "nearest": [name for name in images if name == "lesion"],
+    }
+    for mode, names in groups.items():
+        if not names:
+            continue
+        batch = torch.stack([torch.from_numpy(images[name].numpy().astype(np.float32)) for name in names]).unsqueeze(1).to(device)
+        out = F.grid_sample(batch, grid.expand(len(names), *grid.shape[1:]), mode=mode, padding_mode="zeros", align_corners=True)
+        out = out[:, 0].cpu().numpy()
+        for i, name in enumerate(names):
+            warped[name] = ants.from_numpy(
+                out[i],
+                origin=reference.origin,
+                spacing=reference.spacing,
+                direction=reference.direction
+            )
+
+    return {name: warped[name] for name in images}
+
+
+def register_subject_to_mni(images_to_register, mni_template, output_dir, type_of_transform, backend = "ants", logger = None):
     """
     Register subject scans to MNI space using a brain-extracted reference image.
 
@@ -11,6 +108,7 @@ def register_subject_to_mni(images_to_register, mni_template, output_dir, type_o
         reference (str): brain-extracted DWI b0 in subject space
         mni_template_path (str): path to MNI template (e.g., brain-only template)
         output_dir (str): folder to save registered images
+        backend (str): registration backend, "ants" (CPU) or "fireants" (GPU)
 
     Returns:
         dict: {name: registered ANTsImage in MNI space}
@@ -19,32 +117,58 @@ def register_subject_to_mni(images_to_register, mni_template, output_dir, type_o
     os.makedirs(reg_path, exist_ok=True)
 
     logger.info("Registering DWI b0 brain to MNI...")
-    reg_b0 = ants.registration(
+    reg_b0 = register(
         fixed=mni_template,
         moving=images_to_register["dwi_b0"],
-        type_of_transform=type_of_transform,  # or "Rigid+Affine", or "SyN" if nonlinear desired
-        verbose=False,
+        transform_type=type_of_transform,  # or "Rigid+Affine", or "SyN" if nonlinear desired
         outprefix=os.path.join(reg_path, "dwi_b0_to_MNI_"),
-        random_seed=42
+        backend=backend,
+        logger=logger
     )
 
     # Apply the same transform to all other images
     registered_images = {}
     transform_list = reg_b0['fwdtransforms']  # forward transforms from subject -> MNI
 
-    for name, img in images_to_register.items():
-        logger.info(f"Applying MNI transform to {name}...")
-        warped = ants.apply_transforms(
-            fixed=mni_template,
-            moving=img,
-            transformlist=transform_list,
-            interpolator='linear' if name != "lesion" else 'nearestNeighbor'  # nearest for masks
+    if torch.cuda.is_available() and all(_same_space(img, images_to_register["dwi_b0"]) for img in images_to_register.values()):
+        logger.info("Applying MNI transform to all images on GPU...")
+        registered_images = warp_images_gpu(
+            images_to_register,
+            reference=mni_template,
+            transform_list=transform_list,
+            composite_path=os.path.join(reg_path, "dwi_b0_to_MNI_")
+        )
+    else:
+        # CPU fallback: load the transform files once instead of once per image
+        composite = load_composite_transform(transform_list)
+
+        for name, img in images_to_register.items():
+            logger.info(f"Applying MNI transform to {name}...")
+            registered_images[name] = ants.apply_ants_transform_to_image(
+                composite,
+                img,
+                reference=mni_template,
+                interpolation='linear' if name != "lesion" else 'nearestneighbor'  # nearest for masks
+            )
+
+    if "lesion" in registered_images:
+        # Binary mask -> store as uint8 (0/1) instead of float32
+        warped = registered_images["lesion"]
+        registered_images["lesion"] = ants.from_numpy(
+            (warped.numpy() > 0).astype(np.uint8),
+            origin=warped.origin,
+            spacing=warped.spacing,
+            direction=warped.direction
         )
-        registered_images[name] = warped
 
-        # Save
-        out_file = os.path.join(reg_path, f"{name}_MNI.nii.gz")
-        ants.image_write(warped, out_file)
+    # Save (independent, IO-bound writes)
+    with ThreadPoolExecutor(max_workers=len(registered_images)) as executor:
+        futures = [
+            executor.submit(ants.image_write, warped, os.path.join(reg_path, f"{name}_MNI.nii.gz"))
+            for name, warped in registered_images.items()
+        ]
+        for future in futures:
+            future.result()
 
     logger.info("Successfully registered subject scans to MNI!")
 
@@ -1,8 +1,11 @@
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 import ants
 from src.pipeline.utils import apply_mask, apply_transform
+from src.pipeline.registration import register
 
-def compute_within_subject_transforms(fixed, moving_dict, output_path, save=True, logger = None):
+def compute_within_subject_transforms(fixed, moving_dict, output_path, save=True, backend="ants", parallelize=False, logger = None):
     """
     Compute within-subject registration transforms for multiple scans to a fixed reference.
 
@@ -12,6 +15,8 @@ def compute_within_subject_transforms(fixed, moving_dict, output_path, save=True
             Example: {"dwi_b0": b0_image, "adc": adc_image, "flair": flair_image}
         output_path (str): Folder to save registered images
         save (bool): Whether to write registered images to disk
+        backend (str): Registration backend, "ants" (CPU) or "fireants" (GPU)
+        parallelize (bool): Register the moving images concurrently (they are independent)
 
     Returns:
         tuple:
@@ -26,31 +31,61 @@ def compute_within_subject_transforms(fixed, moving_dict, output_path, save=True
 
     # Registration settings
     reg_kwargs = {
-        "type_of_transform": "Rigid",
-        "verbose": False,
+        "transform_type": "Rigid",
+        "backend": backend,
     }
 
-    for name, moving in moving_dict.items():
+    def register_moving(name, moving):
         outprefix = os.path.join(output_path, f"{name}_to_fixed_")
         logger.info(f"Registering {name} to fixed image...")
         try:
-            reg = ants.registration(fixed=fixed, moving=moving, outprefix=outprefix, random_seed=42, **reg_kwargs)
+            reg = register(fixed=fixed, moving=moving, outprefix=outprefix, logger=logger, **reg_kwargs)
         except Exception as e:
             logger.error(f"Registration failed for {name}: {e}")
             raise
-        # Store transformed image and transform dictionary
-        registered_images[name] = reg["warpedmovout"]
-        transforms[name] = reg["fwdtransforms"]
 
         # Save registered image if requested
         if save:
             ants.image_write(reg["warpedmovout"], os.path.join(output_path, f"{name}_registered.nii.gz"))
-        
-        logger.info("Within-subject registration completed for all moving images.")
+        return reg
+
+    if parallelize and len(moving_dict) > 1:
+        with ThreadPoolExecutor(max_workers=len(moving_dict)) as executor:
+            futures = {executor.submit(register_moving, name, moving): name for name, moving in moving_dict.items()}
+            regs = {futures[future]: future.result() for future in as_completed(futures)}
+    else:
+        regs = {name: register_moving(name, moving) for name, moving in moving_dict.items()}
+
+    # Store transformed image and transform dictionary (in moving_dict order)
+    for name in moving_dict:
+        registered_images[name] = regs[name]["warpedmovout"]
+        transforms[name] = regs[name]["fwdtransforms"]
+
+    logger.info("Within-subject registration completed for all moving images.")
 
     return registered_images, transforms
 
 
+def is_identity_transform(transform_list, atol=1e-3):
+    """Return True if transform_list is a single affine transform that is (numerically) the identity."""
+    if len(transform_list) != 1 or not transform_list[0].endswith(".mat"):
+        return False
+    params = np.asarray(ants.read_transform(transform_list[0]).parameters)
+    if params.size != 12:
+        return False
+    return np.allclose(params[:9], np.eye(3).flatten(), atol=atol) and np.allclose(params[9:], 0, atol=atol)
+
+
+def to_binary_mask(mask):
+    """Binarize a mask and store it as uint8."""
+    return ants.from_numpy(
+        (mask.numpy() > 0).astype(np.uint8),
+        origin=mask.origin,
+        spacing=mask.spacing,
+        direction=mask.direction
+    )
+
+
 def apply_transforms_and_brain_masks(
     registered: dict,
     dwi_b1000,
@@ -70,17 +105,24 @@ def apply_transforms_and_brain_masks(
     logger.info("Applying registration transforms to brain masks...")
 
     # Transform BET masks into registered (b1000) space
-    b0_mask_reg = apply_transform(
+    b0_mask_reg = to_binary_mask(apply_transform(
         fixed=registered["dwi_b0"],
         moving_mask=brain_masks["dwi_b0_brain_mask"],
-        transform_list=transforms["dwi_b0"]
-    )
-
-    flair_mask_reg = apply_transform(
-        fixed=registered["flair"],
-        moving_mask=brain_masks["flair_brain_mask"],
-        transform_list=transforms["flair"]
-    )
+        transform_list=transforms["dwi_b0"],
+        interpolator="nearestNeighbor"
+    ))
+
+    # FLAIR already aligned with b1000 -> its own mask (computed on the b1000 grid) needs no resampling
+    if is_identity_transform(transforms["flair"]):
+        logger.info("FLAIR transform is the identity, skipping the FLAIR brain mask warp.")
+        flair_mask_reg = to_binary_mask(brain_masks["flair_brain_mask"])
+    else:
+        flair_mask_reg = to_binary_mask(apply_transform(
+            fixed=registered["flair"],
+            moving_mask=brain_masks["flair_brain_mask"],
+            transform_list=transforms["flair"],
+            interpolator="nearestNeighbor"
+        ))
 
     logger.info("Applying brain masks to registered images...")
 
@@ -2,12 +2,28 @@ import os
 import shutil
 from typing import List, Dict
 import logging
-import subprocess
+import functools
+import atexit
+import queue
+import threading
+import uuid
 import csv
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np 
+import nibabel as nib
 import ants
 import torch
 
+# Directories already created by this process
+_ensured_dirs: set = set()
+
+
+def _ensure_dir(path: str):
+    """os.makedirs(path, exist_ok=True), skipped for directories created earlier in this process."""
+    if path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
+
 
 def load_and_check_images(paths_dict, logger = None):
     """
@@ -20,25 +36,107 @@ def load_and_check_images(paths_dict, logger = None):
     Returns:
         dict: {name: ANTsImage}
     """
-    loaded_images = {}
-
+    # Validate everything first so we fail before any (slow) loading
     for name, path in paths_dict.items():
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"File for {name} does not exist: {path}")
-        if not path.endswith((".nii", ".nii.gz")):
+        # One stat per file (metadata calls are expensive on network filesystems)
+        try:
+            os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File for {name} does not exist: {path}") from None
+        if not path.lower().endswith((".nii", ".nii.gz")):
             raise ValueError(f"File for {name} is not a NIfTI: {path}")
 
-        logger.info(f"Loading {name}: {path}")
-        loaded_images[name] = load_img(path)
+        logger.info("Loading %s: %s", name, path)
+
+    # Files are independent and ITK releases the GIL while reading/decompressing
+    items = list(paths_dict.items())
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(items)))) as executor:
+        loaded_images = dict(zip(paths_dict, executor.map(lambda item: load_img(item[1]), items)))
 
     logger.info("All images loaded successfully.")
     return loaded_images
 
 
-def load_img(raw_img_path, orient="RAS"):
-    ants_image = ants.image_read(raw_img_path, reorient=orient)
+# Read-ahead only pays off for large compressed files (gzip decoding reads them sequentially)
+READAHEAD_MIN_BYTES = 32 * 1024 * 1024
+
+
+def _fadvise(path, advice, min_size=0):
+    """
+    Give the kernel a page-cache hint for a whole file (no-op where unsupported).
+    advice is the suffix of an os.POSIX_FADV_* constant, e.g. "WILLNEED" or "DONTNEED".
+    Files smaller than min_size bytes are skipped.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if os.fstat(fd).st_size >= min_size:
+                os.posix_fadvise(fd, 0, 0, getattr(os, f"POSIX_FADV_{advice}"))
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def load_img(raw_img_path, orient="RAS", pixeltype="float", drop_cache=False):
+    """
+    Load an image as ANTsImage.
+    drop_cache=True evicts the file from the page cache afterwards (for files read only once).
+    """
+    # Start reading large .nii.gz files ahead into the page cache
+    if str(raw_img_path).endswith(".nii.gz"):
+        _fadvise(raw_img_path, "WILLNEED", min_size=READAHEAD_MIN_BYTES)
+
+    ants_image = _read_img(raw_img_path, orient=orient, pixeltype=pixeltype)
+
+    if drop_cache:
+        _fadvise(raw_img_path, "DONTNEED")
+    return ants_image
+
+
+def _read_img(raw_img_path, orient="RAS", pixeltype="float"):
+    # 3D float NIfTI → decode once with nibabel (uses indexed_gzip for .nii.gz when installed)
+    if pixeltype == "float" and str(raw_img_path).endswith((".nii", ".nii.gz")):
+        nib_image = nib.load(raw_img_path, keep_file_open=True)
+        if nib_image.ndim == 3 and _itk_compatible_affine(nib_image):
+            ants_image = nibabel_to_ants(nib_image)
+            # Skip the reorientation copy for images already in the requested orientation
+            if orient and ants.get_orientation(ants_image) != orient:
+                ants_image = ants.reorient_image2(ants_image, orientation=orient)
+            return ants_image
+
+    ants_image = ants.image_read(raw_img_path, pixeltype=pixeltype, reorient=orient)
     return ants_image
 
+
+def _itk_compatible_affine(nib_image):
+    """
+    True if nibabel's affine gives the same geometry ITK's NIfTI reader would:
+    qform and sform agree (so the qform/sform choice does not matter) and the
+    direction is orthonormal (ITK orthonormalizes it, e.g. for a sheared sform).
+    """
+    header = nib_image.header
+    qform = header.get_qform()
+    if not (np.allclose(qform, header.get_sform()) and np.allclose(nib_image.affine, qform)):
+        return False
+    linear = nib_image.affine[:3, :3]
+    direction = linear / np.linalg.norm(linear, axis=0)
+    return np.allclose(direction.T @ direction, np.eye(3), atol=1e-6)
+
+
+def nibabel_to_ants(nib_image):
+    """Convert a 3D nibabel image to an ANTsImage (RAS affine → ITK LPS geometry)."""
+    affine = np.diag([-1.0, -1.0, 1.0, 1.0]) @ nib_image.affine
+    spacing = np.linalg.norm(affine[:3, :3], axis=0)
+    return ants.from_numpy(
+        nib_image.get_fdata(dtype=np.float32),
+        origin=affine[:3, 3].tolist(),
+        spacing=spacing.tolist(),
+        direction=affine[:3, :3] / spacing
+    )
+
 def resample_image_to_target(
     image: ants.ANTsImage,
     target: ants.ANTsImage,
@@ -59,15 +157,44 @@ def resample_image_to_target(
 
 
 def normalize_image(image):
-    normalized_img = ants.iMath(image, "Normalize")
+    # Min-max normalization to [0, 1] (same as iMath "Normalize", without the dispatch/extra copy)
+    arr = image.view()
+    mn = arr.min()
+    mx = arr.max()
+    scale = np.float32(1.0 / (mx - mn)) if mx > mn else np.float32(0)
+    out = (arr - np.float32(mn)) * scale
+    normalized_img = ants.from_numpy(
+        out.astype(np.float32, copy=False),
+        origin=image.origin,
+        spacing=image.spacing,
+        direction=image.direction
+    )
     return normalized_img
 
 
+def _unlink_if_exists(file: str):
+    try:
+        os.unlink(file)
+    except FileNotFoundError:
+        pass
+
+
+def _run_unlinks(unlink, files: List[str]):
+    """
+    Apply unlink to every file. Unlinks are independent (and round-trips on network
+    filesystems) → run them concurrently, unless there are only one or two.
+    """
+    if len(files) <= 2:
+        for file in files:
+            unlink(file)
+        return
+    with ThreadPoolExecutor(max_workers=min(16, len(files))) as executor:
+        list(executor.map(unlink, files))
+
+
 def delete_temp_files(files: List[str]):
     """Delete temporary files if the flag is set."""
-    for file in files:
-        if os.path.exists(file):
-            os.remove(file)
+    _run_unlinks(_unlink_if_exists, list(files))
 
 
 def mirror_pain_mask(pain_mask_path, output_path):
@@ -87,17 +214,12 @@ def mirror_pain_mask(pain_mask_path, output_path):
     pain_mask = load_img(pain_mask_path)
     pain_data = pain_mask.numpy() > 0
 
-    # Mirror mask across x-axis (left-right)
-    pain_data_flipped = np.flip(pain_data, axis=0)
-
-    # Initialize combined mask
-    combined_mask = np.zeros_like(pain_data, dtype=np.uint8)
+    # Mirror mask across x-axis (left-right), a view without copy
+    pain_data_flipped = pain_data[::-1]
 
-    # Assign left hemisphere voxels = 1
-    combined_mask[pain_data] = 1
-
-    # Assign right hemisphere voxels = 2
-    combined_mask[pain_data_flipped] = 2
+    # Left hemisphere voxels = 1, right hemisphere voxels = 2 (right wins on overlap)
+    # (bool is 1 byte → reinterpret as uint8 0/1 without a conversion pass)
+    combined_mask = np.where(pain_data_flipped, np.uint8(2), pain_data.view(np.uint8))
 
     # Convert back to ANTs image
     combined_img = ants.from_numpy(
@@ -108,26 +230,131 @@ def mirror_pain_mask(pain_mask_path, output_path):
     )
 
     # Ensure output folder exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    _ensure_dir(os.path.dirname(output_path))
     ants.image_write(combined_img, output_path)
     print(f"Saved mirrored pain mask to {output_path}")
 
 
-def apply_transform(fixed, moving_mask, transform_list):
+def apply_transform(fixed, moving_mask, transform_list, interpolator="linear"):
     """Apply transforms to a brain mask."""
+    # Single precision: antsApplyTransforms allocates its internal images as float instead of double
     return ants.apply_transforms(
         fixed=fixed,
         moving=moving_mask,
-        transformlist=transform_list
+        transformlist=transform_list,
+        interpolator=interpolator,
+        singleprecision=True
     )
 
-def apply_mask(image, mask):
-    """Apply mask to an image."""
-    return image * mask
+def apply_mask(image, mask, inplace=False):
+    """
+    Apply mask to an image.
+    With inplace=True the image buffer is overwritten (use when the unmasked image is no longer needed).
+    """
+    # Same check as ANTsImage.__mul__
+    if not ants.image_physical_space_consistency(image, mask):
+        raise ValueError("Image and mask do not occupy the same physical space.")
+
+    if inplace:
+        image.view()[...] *= mask.view()
+        return image
+
+    masked = np.multiply(image.view(), mask.view(), dtype=np.float32)
+    return ants.from_numpy(
+        masked,
+        origin=image.origin,
+        spacing=image.spacing,
+        direction=image.direction
+    )
 
 
 
-def housekeeping(output_dir: str, save_intermediate: bool, logger=None):
+def remove_tree(path: str, parallel: bool = True):
+    """
+    Recursively delete a folder, ignoring errors (like shutil.rmtree(path, ignore_errors=True)).
+    A symlink to a folder is removed itself, its target is left untouched.
+    With parallel=False the files are unlinked serially (no thread pool).
+    """
+    if os.path.islink(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        return
+
+    files, dirs = [], []
+
+    def collect(folder):
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    # DirEntry caches the file type → no extra stat per entry
+                    if entry.is_dir(follow_symlinks=False):
+                        collect(entry.path)
+                    else:
+                        files.append(entry.path)
+        except OSError:
+            pass
+        dirs.append(folder)  # children are appended before their parent
+
+    def unlink_quietly(file):
+        try:
+            os.unlink(file)
+        except OSError:
+            pass
+
+    collect(path)
+    if parallel:
+        _run_unlinks(unlink_quietly, files)
+    else:
+        for file in files:
+            unlink_quietly(file)
+
+    for folder in dirs:
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass
+
+
+# Single background worker for folder deletions (shared by all subjects in the process)
+_cleanup_queue = queue.Queue()
+_cleanup_lock = threading.Lock()
+_cleanup_thread = None
+
+
+def _cleanup_worker():
+    while True:
+        paths, logger = _cleanup_queue.get()
+        try:
+            for path in paths:
+                # Serial deletion: no executor here, since concurrent.futures refuses
+                # new work during interpreter shutdown, when atexit waits for this worker
+                remove_tree(path, parallel=False)
+            logger.info("Background cleanup complete.")
+        except Exception as e:
+            logger.error("Background cleanup failed: %s", e)
+        finally:
+            _cleanup_queue.task_done()
+
+
+def wait_for_cleanup():
+    """Block until all folder deletions scheduled by housekeeping(background=True) are done."""
+    _cleanup_queue.join()
+
+
+def _schedule_cleanup(paths, logger):
+    """Delete folders on the background worker. Pending deletions are finished before the process exits."""
+    global _cleanup_thread
+    with _cleanup_lock:
+        if _cleanup_thread is None:
+            _cleanup_thread = threading.Thread(target=_cleanup_worker, name="cleanup", daemon=True)
+            _cleanup_thread.start()
+            atexit.register(wait_for_cleanup)
+    _cleanup_queue.put((paths, logger))
+
+
+def housekeeping(output_dir: str, save_intermediate: bool, logger=None, background: bool = True):
     """
     Handles cleanup of intermediate folders and relocation of final DeepISLES output.
 
@@ -135,6 +362,8 @@ def housekeeping(output_dir: str, save_intermediate: bool, logger=None):
     1. Move lesion_msk.nii.gz one folder up.
     2. Delete results/ folder.
     3. If save_intermediate=False → delete intermediate folders.
+
+    With background=True the deletions (2, 3) run on a background thread so the caller returns immediately.
     """
 
     # Move lesion_msk.nii.gz up
@@ -144,14 +373,20 @@ def housekeeping(output_dir: str, save_intermediate: bool, logger=None):
 
     if os.path.exists(lesion_src):
         logger.info("Moving lesion_msk.nii.gz to output directory...")
-        shutil.move(lesion_src, lesion_dst)
+        try:
+            # Same filesystem → single rename, no copy
+            os.replace(lesion_src, lesion_dst)
+        except OSError:
+            shutil.move(lesion_src, lesion_dst)
     else:
         logger.info("Warning: lesion_msk.nii.gz not found. DeepISLES may have failed.")
 
+    to_delete = []
+
     # Delete results/ folder
     if os.path.exists(results_dir):
         logger.info("Deleting empty folder...")
-        shutil.rmtree(results_dir, ignore_errors=True)
+        to_delete.append(results_dir)
 
     # Delete intermediate folders
     if not save_intermediate:
@@ -164,13 +399,34 @@ def housekeeping(output_dir: str, save_intermediate: bool, logger=None):
         for folder in intermediate_dirs:
             folder_path = os.path.join(output_dir, folder)
             if os.path.exists(folder_path):
-                logger.info(f"Deleting: {folder_path}")
-                shutil.rmtree(folder_path, ignore_errors=True)
+                to_delete.append(folder_path)
     else:
         logger.info("Keeping intermediate files as requested.")
 
-    logger.info("Housekeeping complete.\n")
+    pending = []
+    for folder_path in to_delete:
+        if background:
+            # Move the folder out of the way first (instant rename), so a new run into the
+            # same output_dir cannot have its fresh folders deleted by this pending job
+            parent, name = os.path.split(folder_path)
+            trash_path = os.path.join(parent, f".{name}.deleting-{uuid.uuid4().hex}")
+            try:
+                os.replace(folder_path, trash_path)
+                logger.info("Deleting in the background: %s", folder_path)
+                pending.append(trash_path)
+                continue
+            except OSError:
+                pass
+        logger.info("Deleting: %s", folder_path)
+        remove_tree(folder_path)
+
+    if pending:
+        _schedule_cleanup(pending, logger)
+        logger.info("Housekeeping complete (folder deletion continues in the background).\n")
+    else:
+        logger.info("Housekeeping complete.\n")
 
+@functools.lru_cache(maxsize=1)  # only successful checks are cached
 def assert_gpu_available():
     if not torch.cuda.is_available():
         raise AssertionError(
@@ -215,25 +471,33 @@ def create_logger(output_dir, name="pipeline_logger"):
     return logger
 
 def resolve_host_path(container_path):
-    with open("/proc/self/mountinfo", "r") as f:
+    target = container_path.encode()
+    with open("/proc/self/mountinfo", "rb") as f:
         for line in f:
-            fields = line.strip().split()
-            if len(fields) >= 5:
-                mount_point = fields[4]
-                if mount_point == container_path:
-                    # host path is the last field
-                    return fields[-1]
+            # Cheap substring test first, only split candidate lines
+            if target not in line:
+                continue
+            fields = line.split()
+            if len(fields) >= 5 and fields[4] == target:
+                # host path is the last field
+                return fields[-1].decode()
     return None
 
 
+# Set once runtime_checks succeeded, the environment does not change within a process
+_runtime_checks_passed = False
+
+
 def runtime_checks(logger):
-    # Check GPU visibility
-    try:
-        out = subprocess.check_output(["nvidia-smi"], stderr=subprocess.STDOUT)
-        logger.info("GPU detected via nvidia-smi.")
-    except Exception:
+    global _runtime_checks_passed
+    if _runtime_checks_passed:
+        return
+
+    # Check GPU visibility (torch is already initialized, no nvidia-smi process needed)
+    if not torch.cuda.is_available() or torch.cuda.device_count() == 0:
         logger.error("ERROR: No GPU detected inside container. Exiting.")
         raise RuntimeError("GPU not available in container.")
+    logger.info("GPU detected via torch.cuda.")
 
     # Check docker socket
     if not os.path.exists("/var/run/docker.sock"):
@@ -246,6 +510,58 @@ def runtime_checks(logger):
         raise RuntimeError("docker CLI missing in container.")
 
     logger.info("Runtime checks passed successfully.")
+    _runtime_checks_passed = True
+
+
+class CSVSink:
+    """
+    Buffered CSV writer for many result rows (e.g. one per subject).
+    Keeps the file and DictWriter open and writes rows in batches of flush_every.
+    The file is opened on the first flush with rows; if it is still empty, the header
+    is written from the first row's keys.
+
+    Example:
+        with CSVSink("results/cpsp_results.csv") as sink:
+            for result in results:
+                sink.write(result)
+    """
+
+    def __init__(self, csv_path: str, flush_every: int = 256):
+        self.csv_path = csv_path
+        self.flush_every = flush_every
+        self._f = None
+        self._writer = None
+        self._buf = []
+
+    def write(self, result: Dict) -> None:
+        self._buf.append(result)
+        if len(self._buf) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buf:
+            if self._writer is None:
+                _ensure_dir(os.path.dirname(self.csv_path))
+                self._f = open(self.csv_path, mode="a", newline="", buffering=1 << 20)
+                self._writer = csv.DictWriter(self._f, fieldnames=self._buf[0].keys())
+                # Append mode starts at the end of the file -> offset 0 means it is empty
+                if self._f.tell() == 0:
+                    self._writer.writeheader()
+            self._writer.writerows(self._buf)
+            self._buf.clear()
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self._f is not None:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
 def save_results_to_csv(
@@ -256,24 +572,14 @@ def save_results_to_csv(
     Save a single result dictionary to a CSV file.
     If the CSV already exists, the result is appended.
     If not, the header is written automatically.
+    Use CSVSink directly when writing many results.
 
     Args:
         result (dict): Dictionary containing result values.
         csv_path (str): Full path to output CSV file.
     """
-
-    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-
-    write_header = not os.path.exists(csv_path)
-
-    with open(csv_path, mode="a", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=result.keys())
-
-        if write_header:
-            writer.writeheader()
-
-        writer.writerow(result)
-
+    with CSVSink(csv_path) as sink:
+        sink.write(result)
 
 
 if __name__ == "__main__":